@@ -1,4 +1,201 @@
-from typing import Dict, List, Any
+import heapq
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, List, Any, Final
+
+_RAW_ACTION_MAP = {
+    "High": {
+        "sexual": ["Block content", "Ban user", "Flag for human review"],
+        "threat": ["Block content", "Ban user", "Flag for human review"],
+        "violence": ["Block content", "Ban user", "Flag for human review"],
+        "hate_speech": ["Block content", "Ban user", "Flag for human review"],
+        "profanity": ["Block content", "Flag for human review"],
+        "spam": ["Auto-delete content", "Flag for human review"]
+    },
+    "Medium": {
+        "sexual": ["Flag for human review"],
+        "threat": ["Flag for human review"],
+        "violence": ["Flag for human review"],
+        "hate_speech": ["Flag for human review"],
+        "profanity": ["Warn user", "Flag for human review"],
+        "spam": ["Warn user", "Flag for human review"]
+    },
+    "Low": {
+        "sexual": ["No action required"],
+        "threat": ["No action required"],
+        "violence": ["No action required"],
+        "hate_speech": ["No action required"],
+        "profanity": ["No action required"],
+        "spam": ["No action required"]
+    }
+}
+
+# Frozen once at import so determine_actions can merge them with a single set union
+ACTION_MAP = {
+    level: {cat: frozenset(acts) for cat, acts in cats.items()}
+    for level, cats in _RAW_ACTION_MAP.items()
+}
+
+CATEGORY_EXPLANATIONS = {
+    "sexual": "This content includes sexual requests or explicit material.",
+    "threat": "This content contains threats or harmful intent.",
+    "violence": "This content promotes violence or harm.",
+    "hate_speech": "This content contains hateful language.",
+    "profanity": "This content includes strong or offensive language.",
+    "spam": "This content appears to be spam or promotional."
+}
+
+CATEGORY_POLICIES = {
+    "sexual": ("Do not allow sexual requests or explicit content.",),
+    "threat": ("Threatening content must be blocked and reported.",),
+    "violence": ("Violence-promoting content must be blocked immediately.",),
+    "hate_speech": ("Hateful or discriminatory content must be blocked.",),
+    "profanity": ("Offensive language should be flagged for review.",),
+    "spam": ("Spam content should be removed automatically or warned.",)
+}
+
+CATEGORY_THRESHOLDS = {
+    "sexual": 0.6,
+    "threat": 0.5,
+    "violence": 0.5,
+    "hate_speech": 0.5,
+    "profanity": 0.6,  # INCREASED from 0.4 to 0.6
+    "spam": 0.6
+}
+
+_DEFAULT_THRESHOLD = 0.5
+# No contributor scoring below this can cross any category threshold
+_MIN_THRESHOLD = min(min(CATEGORY_THRESHOLDS.values()), _DEFAULT_THRESHOLD)
+
+_BANNER_SEP: Final = " ⚠️ "
+_BANNER_HIGH: Final = "Content violates safety guidelines - review required"
+_BANNER_MEDIUM: Final = "Content may need review - check for context"
+_BANNER_LOW: Final = "Content appears safe"
+_NO_ISSUES_REASON: Final = "No safety issues detected"
+_DEFAULT_BANNER = {"High": _BANNER_HIGH, "Medium": _BANNER_MEDIUM, "Low": _BANNER_LOW}
+
+_DEFAULT_POLICY = ("Follow platform moderation rules.",)
+
+# Closed action vocabulary: each action gets one bit so selections accumulate in an int
+_ACTION_NAMES = tuple(sorted(
+    {a for cats in ACTION_MAP.values() for acts in cats.values() for a in acts}
+    | {"Flag for human review", "Block content", "No action required"}
+))
+_ACTION_BITS = {name: 1 << i for i, name in enumerate(_ACTION_NAMES)}
+
+def _actions_mask(actions) -> int:
+    mask = 0
+    for a in actions:
+        mask |= _ACTION_BITS[a]
+    return mask
+
+def _mask_to_actions(mask: int) -> List[str]:
+    return [name for i, name in enumerate(_ACTION_NAMES) if mask >> i & 1]
+
+_HIGH_MASK = _actions_mask(("Flag for human review", "Block content"))
+_MED_MASK = _actions_mask(("Flag for human review",))
+_NO_ACTION_MASK = _actions_mask(("No action required",))
+
+# Only High risk is auto-blocked; Medium is just flagged for review
+_ESCALATION_MASK = {"High": _HIGH_MASK, "Medium": _MED_MASK, "Low": 0}
+
+# (risk_level, category) -> (actions mask, policies, explanation), precomputed for the contributor loop
+# Canonical category order; thresholds and fused rows are tuples indexed by it
+_CAT_ORDER = tuple(CATEGORY_THRESHOLDS)
+_CAT_IDX = {cat: i for i, cat in enumerate(_CAT_ORDER)}
+_THRESHOLDS = tuple(CATEGORY_THRESHOLDS[cat] for cat in _CAT_ORDER)
+
+_FUSED = {
+    lvl: tuple(
+        (
+            _actions_mask(ACTION_MAP[lvl].get(cat, ())),
+            CATEGORY_POLICIES.get(cat, _DEFAULT_POLICY),
+            CATEGORY_EXPLANATIONS.get(cat, "")
+        )
+        for cat in _CAT_ORDER
+    )
+    for lvl in ACTION_MAP
+}
+# Rows for a risk level missing from ACTION_MAP: policies and explanations, no actions
+_UNMAPPED_ROWS = tuple(
+    (0, CATEGORY_POLICIES.get(cat, _DEFAULT_POLICY), CATEGORY_EXPLANATIONS.get(cat, ""))
+    for cat in _CAT_ORDER
+)
+_UNKNOWN_CATEGORY_ROW = (0, _DEFAULT_POLICY, "")
+
+@lru_cache(maxsize=4096)
+def _select_actions(risk_level: str, contributors: tuple) -> tuple:
+    """
+    Pure core of determine_actions, memoized on (risk_level, ((category, score), ...)).
+    Returns (actions, policies, banner_message) with actions/policies as sorted tuples.
+    """
+    selected_mask = 0
+    policy_texts = set()
+    friendly_reasons: Dict[str, None] = {}  # insertion-ordered, drops repeated explanations
+
+    # Loop invariants as locals; explanations already live in the fused rows
+    level_rows = _FUSED.get(risk_level, _UNMAPPED_ROWS)
+    cat_idx = _CAT_IDX
+    thresholds = _THRESHOLDS
+    min_threshold = _MIN_THRESHOLD
+    add_policies = policy_texts.update
+
+    # Process each contributor
+    for category, score in contributors:
+        if score < min_threshold:
+            continue
+        idx = cat_idx.get(category)
+        if idx is None:
+            # Category outside the canonical set: default threshold, generic policy only
+            if score < _DEFAULT_THRESHOLD:
+                continue
+            row = _UNKNOWN_CATEGORY_ROW
+        elif score < thresholds[idx]:
+            continue
+        else:
+            row = level_rows[idx]
+        actions_mask, policies, explanation = row
+        selected_mask |= actions_mask
+        add_policies(policies)
+        if explanation:
+            friendly_reasons[explanation] = None
+
+    # IMPROVED LOGIC: More proportional actions
+    selected_mask |= _ESCALATION_MASK.get(risk_level, 0)
+
+    # Fallback if no actions selected
+    if not selected_mask:
+        selected_mask = _NO_ACTION_MASK
+        friendly_reasons = {_NO_ISSUES_REASON: None}
+
+    # IMPROVED BANNER MESSAGES
+    banner_message = _DEFAULT_BANNER.get(risk_level, _BANNER_LOW)
+
+    # Override with specific reasons if available
+    if friendly_reasons:
+        banner_message = _BANNER_SEP.join(friendly_reasons)
+
+    return tuple(_mask_to_actions(selected_mask)), tuple(sorted(policy_texts)), banner_message
+
+@lru_cache(maxsize=256)
+def _simplify_reason(reason: str) -> str:
+    # Reasons come from a small fixed set of category strings, so results are cached
+    reason = reason.lower()
+    if "sexual" in reason: return "This content may contain sexual material."
+    if "threat" in reason: return "This content may contain threatening language."
+    if "violence" in reason: return "This content may promote violence."
+    if "hate_speech" in reason or "hate" in reason: return "This content may contain hateful language."
+    if "profanity" in reason: return "This content contains offensive language."
+    if "spam" in reason: return "This content may be spam."
+    return "This content may violate platform rules."
+
+def _format_entities(entities, limit: int = 4) -> str:
+    # NLPProcessor.extract_entities returns {type: [entity, ...]}; flatten that shape
+    if type(entities) is dict:
+        entities = chain.from_iterable(entities.values())
+    return ", ".join(
+        e.get("text", str(e)) if type(e) is dict else str(e) for e in islice(entities, limit)
+    )
 
 class ActionAgent:
     """
@@ -7,153 +204,83 @@ class ActionAgent:
     into user-friendly actions, recommended policies, and reasons for display.
     """
 
-    ACTION_MAP = {
-        "High": {
-            "sexual": ["Block content", "Ban user", "Flag for human review"],
-            "threat": ["Block content", "Ban user", "Flag for human review"],
-            "violence": ["Block content", "Ban user", "Flag for human review"],
-            "hate_speech": ["Block content", "Ban user", "Flag for human review"],
-            "profanity": ["Block content", "Flag for human review"],
-            "spam": ["Auto-delete content", "Flag for human review"]
-        },
-        "Medium": {
-            "sexual": ["Flag for human review"],
-            "threat": ["Flag for human review"],
-            "violence": ["Flag for human review"],
-            "hate_speech": ["Flag for human review"],
-            "profanity": ["Warn user", "Flag for human review"],
-            "spam": ["Warn user", "Flag for human review"]
-        },
-        "Low": {
-            "sexual": ["No action required"],
-            "threat": ["No action required"],
-            "violence": ["No action required"],
-            "hate_speech": ["No action required"],
-            "profanity": ["No action required"],
-            "spam": ["No action required"]
-        }
-    }
-
-    CATEGORY_EXPLANATIONS = {
-        "sexual": "This content includes sexual requests or explicit material.",
-        "threat": "This content contains threats or harmful intent.",
-        "violence": "This content promotes violence or harm.",
-        "hate_speech": "This content contains hateful language.",
-        "profanity": "This content includes strong or offensive language.",
-        "spam": "This content appears to be spam or promotional."
-    }
-
-    CATEGORY_POLICIES = {
-        "sexual": ["Do not allow sexual requests or explicit content."],
-        "threat": ["Threatening content must be blocked and reported."],
-        "violence": ["Violence-promoting content must be blocked immediately."],
-        "hate_speech": ["Hateful or discriminatory content must be blocked."],
-        "profanity": ["Offensive language should be flagged for review."],
-        "spam": ["Spam content should be removed automatically or warned."]
-    }
+    __slots__ = ()
+    _instance = None
 
-    CATEGORY_THRESHOLDS = {
-        "sexual": 0.6,
-        "threat": 0.5,
-        "violence": 0.5,
-        "hate_speech": 0.5,
-        "profanity": 0.6,  # INCREASED from 0.4 to 0.6
-        "spam": 0.6
-    }
+    def __new__(cls):
+        # Stateless, so every ActionAgent() shares one instance
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
 
-    def __init__(self):
-        pass
+    ACTION_MAP = ACTION_MAP
+    CATEGORY_EXPLANATIONS = CATEGORY_EXPLANATIONS
+    CATEGORY_POLICIES = CATEGORY_POLICIES
+    CATEGORY_THRESHOLDS = CATEGORY_THRESHOLDS
 
-    def get_policy(self, category: str) -> List[str]:
+    @staticmethod
+    def get_policy(category: str) -> List[str]:
         """Return platform policy for the category."""
-        return self.CATEGORY_POLICIES.get(category, ["Follow platform moderation rules."])
-
-    def determine_actions(self, risk_result: Dict[str, Any], classification: Dict[str, float], nlp_analysis: Dict[str, Any] | None = None) -> Dict[str, Any]:
-        selected_actions = set()
-        policy_texts = set()
-        friendly_reasons = []
+        return list(CATEGORY_POLICIES.get(category, _DEFAULT_POLICY))
 
+    @staticmethod
+    def determine_actions(risk_result: Dict[str, Any], classification: Dict[str, float], nlp_analysis: Dict[str, Any] | None = None, include_explanation: bool = True) -> Dict[str, Any]:
+        """
+        Map a RiskAgent result to actions, policies, banner and explanation.
+        `top_contributors` is ordered by weighted contribution (not raw score),
+        so every contributor is visited; low scores are rejected before any lookup.
+        Pass include_explanation=False when only actions are needed; "explanation" is then None.
+        """
         risk_level = risk_result.get("level", "Low")
         reasons = risk_result.get("reasons", [])
         contributions = risk_result.get("top_contributors", [])
 
-        # Process each contributor
-        for contrib in contributions:
-            category = contrib.get("category")
-            score = contrib.get("score", 0.0)
-            threshold = self.CATEGORY_THRESHOLDS.get(category, 0.5)
-            if score >= threshold:
-                # Get actions for this risk level and category
-                category_actions = self.ACTION_MAP.get(risk_level, {}).get(category, [])
-                selected_actions.update(category_actions)
-                
-                # Policies
-                for pol in self.get_policy(category):
-                    policy_texts.add(pol)
-                
-                # Friendly explanation
-                explanation = self.CATEGORY_EXPLANATIONS.get(category)
-                if explanation:
-                    friendly_reasons.append(explanation)
-
-        # IMPROVED LOGIC: More proportional actions
-        if risk_level == "High":
-            selected_actions.add("Flag for human review")
-            selected_actions.add("Block content")  # Auto-block only High risk
-        elif risk_level == "Medium":
-            selected_actions.add("Flag for human review")  # Just flag for review
-            # Don't auto-block Medium risk
-
-        # Fallback if no actions selected
-        if not selected_actions:
-            selected_actions.add("No action required")
-            friendly_reasons = ["No safety issues detected"]
-
-        # IMPROVED BANNER MESSAGES
-        if risk_level == "High":
-            banner_message = "Content violates safety guidelines - review required"
-        elif risk_level == "Medium":
-            banner_message = "Content may need review - check for context"
-        else:
-            banner_message = "Content appears safe"
-
-        # Override with specific reasons if available
-        if friendly_reasons:
-            banner_message = " ⚠️ ".join(friendly_reasons)
+        # Actions/policies/banner depend only on the level and (category, score) pairs
+        contributors_key = tuple((c.get("category"), c.get("score", 0.0)) for c in contributions)
+        actions, policies, banner_message = _select_actions(risk_level, contributors_key)
+        selected_actions = list(actions)
 
         # Detailed multi-sentence explanation including NLP analysis
-        explanation = self._build_explanation(
-            risk_level=risk_level,
-            reasons=reasons,
-            selected_actions=list(selected_actions),
-            nlp_analysis=nlp_analysis or {},
-            classification=classification,
-            top_contributors=contributions
-        )
+        explanation = None
+        if include_explanation:
+            explanation = ActionAgent._build_explanation(
+                risk_level=risk_level,
+                reasons=reasons,
+                actions_text=", ".join(selected_actions),
+                nlp_analysis=nlp_analysis or {},
+                classification=classification,
+                top_contributors=contributions
+            )
 
         return {
-            "actions": list(selected_actions),
+            "actions": selected_actions,
             "banner_message": banner_message,
-            "policies": list(policy_texts),
+            "policies": list(policies),
             "explanation": explanation
         }
 
-    def _simplify_reason(self, reason: str) -> str:
-        reason = reason.lower()
-        if "sexual" in reason: return "This content may contain sexual material."
-        if "threat" in reason: return "This content may contain threatening language."
-        if "violence" in reason: return "This content may promote violence."
-        if "hate_speech" in reason or "hate" in reason: return "This content may contain hateful language."
-        if "profanity" in reason: return "This content contains offensive language."
-        if "spam" in reason: return "This content may be spam."
-        return "This content may violate platform rules."
+    @staticmethod
+    def determine_actions_batch(
+        risk_results: List[Dict[str, Any]],
+        classifications: List[Dict[str, float]],
+        nlp_analyses: List[Dict[str, Any] | None] | None = None,
+        include_explanation: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Determine actions for many moderation results in one call (same output as determine_actions per item)."""
+        if nlp_analyses is None:
+            nlp_analyses = [None] * len(risk_results)
+        determine = ActionAgent.determine_actions
+        return [
+            determine(risk_result, classification, nlp_analysis, include_explanation)
+            for risk_result, classification, nlp_analysis in zip(risk_results, classifications, nlp_analyses)
+        ]
 
+    @staticmethod
     def _build_explanation(
-        self,
         *,
         risk_level: str,
         reasons: List[str],
-        selected_actions: List[str],
+        actions_text: str,
         nlp_analysis: Dict[str, Any],
         classification: Dict[str, float],
         top_contributors: List[Dict[str, Any]]
@@ -163,18 +290,17 @@ class ActionAgent:
 
         # Sentence 2: Top contributors
         if isinstance(top_contributors, list) and top_contributors:
-            top_parts = []
-            for c in top_contributors[:3]:
-                cat = c.get("category", "unknown")
-                score = c.get("score", 0.0)
-                top_parts.append(f"{cat} ({score:.2f})")
-            sentence2 = "Top contributing factors include " + ", ".join(top_parts) + "."
+            top_text = ", ".join(
+                f"{c.get('category', 'unknown')} ({c.get('score', 0.0):.2f})" for c in top_contributors[:3]
+            )
+            sentence2 = f"Top contributing factors include {top_text}."
         else:
             # Fallback: infer from classification
-            top_items = sorted(
+            top_items = heapq.nlargest(
+                3,
                 ((k, v) for k, v in classification.items() if k != "normal"),
-                key=lambda kv: kv[1], reverse=True
-            )[:3]
+                key=lambda kv: kv[1]
+            )
             if top_items:
                 sentence2 = "Top contributing factors include " + ", ".join([f"{k} ({v:.2f})" for k, v in top_items]) + "."
             else:
@@ -182,10 +308,10 @@ class ActionAgent:
 
         # Sentence 3: NLP analysis summary/entities
         summary_text = ""
-        if isinstance(nlp_analysis, dict):
+        if nlp_analysis and isinstance(nlp_analysis, dict):
             summary = nlp_analysis.get("summary")
-            entities = nlp_analysis.get("entities") or []
-            ent_text = ", ".join([e.get("text", str(e)) if isinstance(e, dict) else str(e) for e in entities[:4]])
+            entities = nlp_analysis.get("entities")
+            ent_text = _format_entities(entities) if entities else ""
             if summary and ent_text:
                 summary_text = f"NLP analysis notes: {summary} Key entities: {ent_text}."
             elif summary:
@@ -196,11 +322,11 @@ class ActionAgent:
             summary_text = "NLP analysis did not surface additional notable context."
 
         # Sentence 4: Actions and rationale
-        if selected_actions:
-            actions_text = ", ".join(selected_actions)
+        if actions_text:
             sentence4 = f"Recommended actions: {actions_text}. These are aligned with platform safety policies for the detected risk profile."
         else:
             sentence4 = "No immediate action is recommended given the current signal strengths."
 
         # Final concise explanation (avoid repeating simplified reasons already reflected in banner)
-        return " ".join([s for s in [sentence1, sentence2, summary_text, sentence4] if s])
\ No newline at end of file
+        # Every branch above assigns a non-empty sentence, so no filtering is needed
+        return f"{sentence1} {sentence2} {summary_text} {sentence4}"
\ No newline at end of file
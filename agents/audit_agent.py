@@ -1,13 +1,97 @@
 import sqlite3
 import os
+import re
+import csv
 import hashlib
 import json
+import orjson
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import uuid
+import time
+import asyncio
+import queue
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from cachetools import TTLCache
+
+def _dumps(obj: Any) -> str:
+    # orjson is several times faster than json.dumps for these small dict/list payloads
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+# Characters json.dumps(ensure_ascii=True) writes as \uXXXX escapes (orjson keeps them raw)
+_NON_ASCII_RE = re.compile('[\x7f-\U0010ffff]')
+
+def _escape_non_ascii(match) -> str:
+    code = ord(match.group())
+    if code > 0xFFFF:
+        # Astral characters become a UTF-16 surrogate pair, as in the stdlib encoder
+        code -= 0x10000
+        return '\\u{:04x}\\u{:04x}'.format(0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u{:04x}'.format(code)
+
+def _ascii_json(text: str) -> str:
+    """orjson output escaped like the stdlib's default, so JSON exports keep their pre-orjson bytes"""
+    return text if text.isascii() and '\x7f' not in text else _NON_ASCII_RE.sub(_escape_non_ascii, text)
+
+# Per-connection tuning; journal_mode=WAL is persistent and set once in init_audit_tables
+_CONNECTION_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-20000;
+"""
+
+# Statements are kept as module constants so every queued row for a table
+# shares one SQL string and the flusher can executemany it in one go
+_SQL_INSERT_AUDIT = '''
+    INSERT INTO audit_logs (
+        audit_id, timestamp, user_id, session_id, content_hash,
+        content_type, content_preview, risk_score, risk_level,
+        classification_scores, actions_taken, policies_applied,
+        nlp_analysis, processing_time_ms, ip_address, user_agent
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_INSERT_AGENT = '''
+    INSERT INTO agent_decisions (
+        audit_id, agent_name, decision_type, input_data,
+        output_data, confidence_score, processing_time_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_INSERT_EVENT = '''
+    INSERT INTO system_events (
+        event_type, event_description, severity, user_id, metadata
+    ) VALUES (?, ?, ?, ?, ?)
+'''
+
+# audit_logs columns in table order; projections are checked against this before
+# being spliced into SQL
+_AUDIT_COLUMNS = (
+    'id', 'audit_id', 'timestamp', 'user_id', 'session_id', 'content_hash',
+    'content_type', 'content_preview', 'risk_score', 'risk_level',
+    'classification_scores', 'actions_taken', 'policies_applied', 'nlp_analysis',
+    'processing_time_ms', 'agent_versions', 'ip_address', 'user_agent', 'created_at'
+)
+_AUDIT_JSON_COLUMNS = frozenset(('classification_scores', 'actions_taken', 'policies_applied', 'nlp_analysis'))
+
+_SUMMARY_CATEGORIES = ('violence', 'hate_speech', 'threat', 'sexual', 'profanity', 'spam', 'normal')
+_CATEGORY_AVERAGES_SQL = "SELECT {} FROM recent_audit WHERE json_valid(classification_scores)".format(
+    ", ".join(f"AVG(json_extract(classification_scores, '$.{c}'))" for c in _SUMMARY_CATEGORIES)
+)
+
+class _LineEcho:
+    """File-like sink for csv.writer that hands each formatted line back to the caller."""
+    def write(self, line: str) -> str:
+        return line
 
 class AuditAgent:
     """
@@ -30,6 +114,7 @@ class AuditAgent:
         self.api_retries = int(os.getenv("AUDIT_API_RETRIES", "3"))
         self.api_verify_tls = os.getenv("AUDIT_API_VERIFY_TLS", "true").lower() != "false"
         self.api_health_path = os.getenv("AUDIT_API_HEALTH_PATH", "/health")
+        self.api_pool_size = int(os.getenv("AUDIT_API_POOL_SIZE", "64"))
 
         # requests session with retries
         self.session = requests.Session() if self.api_enabled else None
@@ -41,19 +126,116 @@ class AuditAgent:
                 allowed_methods=["GET", "POST"],
                 raise_on_status=False
             )
-            adapter = HTTPAdapter(max_retries=retry_cfg)
+            # Keep-alive pool large enough that concurrent request threads don't re-handshake
+            adapter = HTTPAdapter(pool_maxsize=self.api_pool_size, max_retries=retry_cfg)
             self.session.mount("http://", adapter)
             self.session.mount("https://", adapter)
+            self.session.headers.update(self._headers())
+
+        # One long-lived SQLite connection per thread, opened lazily by _conn()
+        self._tls = threading.local()
+
+        # Local writes are queued and flushed in batches by a background thread
+        self.batch_size = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+        self.flush_interval = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "100")) / 1000.0
+        self._write_queue = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="audit-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+        # Remote moderation decisions are buffered and sent as POST /audit/log/bulk; servers
+        # that answer 404/405 there get one POST /audit/log per decision from then on
+        self.bulk_supported = True
+        self.bulk_size = int(os.getenv("AUDIT_API_BULK_SIZE", "500"))
+        self.bulk_interval = float(os.getenv("AUDIT_API_BULK_INTERVAL_MS", "100")) / 1000.0
+        self._remote_queue = queue.Queue()
+        if self.api_enabled:
+            threading.Thread(target=self._send_loop, name="audit-sender", daemon=True).start()
+            atexit.register(self.flush_remote)
+
+        # Gemini summary enrichment runs off the logging path (remote API mode only)
+        self.use_gemini_summary = os.getenv("AUDIT_USE_GEMINI_SUMMARY", "false").lower() == "true"
+        self._gemini_pool = (
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="audit-gemini")
+            if self.api_enabled and self.use_gemini_summary else None
+        )
+
+        # Gemini decision summaries, keyed by a hash of the decision payload
+        self._gemini_cache = TTLCache(maxsize=4096, ttl=int(os.getenv("AUDIT_GEMINI_TTL", "600")))
+        self._gemini_cache_lock = threading.Lock()
 
         # Initialize local DB if API not configured
+        self._tables_ready = False
+        self.events_have_audit_ref = False
         if not self.api_enabled:
             self.init_audit_tables()
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.executescript(_CONNECTION_PRAGMAS)
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = self._tls.conn = self._connect()
+        return conn
+
+    def _enqueue(self, sql: str, params: tuple):
+        if not self._tables_ready:
+            # API mode skips init at startup; create the fallback tables on first local write
+            self.init_audit_tables()
+        self._write_queue.put_nowait((sql, params))
+        if self._write_queue.qsize() >= self.batch_size:
+            self._flush_wakeup.set()
+
+    def _flush_loop(self):
+        while True:
+            self._flush_wakeup.wait(self.flush_interval)
+            self._flush_wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit flush failed: {e}")
+
+    def flush(self):
+        """Write all queued audit rows to SQLite, one transaction per batch."""
+        with self._flush_lock:
+            items = []
+            while True:
+                try:
+                    items.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not items:
+                return
+
+            conn = self._conn()
+            try:
+                # Consecutive rows for the same table share one executemany
+                for sql, group in groupby(items, key=itemgetter(0)):
+                    conn.executemany(sql, [params for _, params in group])
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                # Retry row by row so one bad row doesn't drop the whole batch
+                for sql, params in items:
+                    try:
+                        conn.execute(sql, params)
+                        conn.commit()
+                    except sqlite3.Error as e:
+                        conn.rollback()
+                        print(f"Dropping audit row: {e}")
+
     def init_audit_tables(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = self._conn()
+        # WAL lets readers proceed during inserts and avoids an fsync per commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._tables_ready = True
 
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS audit_logs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 audit_id TEXT UNIQUE NOT NULL,
@@ -77,7 +259,7 @@ class AuditAgent:
             )
         ''')
 
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS agent_decisions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 audit_id TEXT NOT NULL,
@@ -92,7 +274,7 @@ class AuditAgent:
             )
         ''')
 
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS system_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 event_type TEXT NOT NULL,
@@ -104,11 +286,46 @@ class AuditAgent:
             )
         ''')
 
+        # Range scans for the summary/trail date filters and their per-column filters
+        conn.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_logs(timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON audit_logs(user_id, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_audit_risk_ts ON audit_logs(risk_level, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_audit_type_ts ON audit_logs(content_type, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_agent_decisions_audit ON agent_decisions(audit_id);
+        ''')
+        self.events_have_audit_ref = self._ensure_event_audit_ref(conn)
+        # Refresh planner statistics only where they are missing or stale
+        conn.execute("PRAGMA optimize")
+
         conn.commit()
-        conn.close()
+
+    def _ensure_event_audit_ref(self, conn: sqlite3.Connection) -> bool:
+        """
+        Expose metadata.audit_id of system events as an indexed generated column, so review
+        lookups probe an index instead of LIKE-scanning metadata. Needs SQLite 3.31+.
+        """
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(system_events)")}
+            if "audit_id_ref" not in columns:
+                # Virtual, so rows written before the column existed are covered too
+                conn.execute('''
+                    ALTER TABLE system_events ADD COLUMN audit_id_ref TEXT GENERATED ALWAYS AS (
+                        CASE WHEN json_valid(metadata) THEN json_extract(metadata, '$.audit_id') END
+                    ) VIRTUAL
+                ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_type_ref ON system_events(event_type, audit_id_ref)")
+            # Superseded by the composite index above
+            conn.execute("DROP INDEX IF EXISTS idx_events_type")
+            return True
+        except sqlite3.Error as e:
+            print(f"system_events.audit_id_ref unavailable, falling back to metadata scans: {e}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_type ON system_events(event_type)")
+            return False
 
     def generate_content_hash(self, content: str) -> str:
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        # blake2b is in the stdlib, so every environment computes the same hash
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=32).hexdigest()
 
     def log_moderation_decision(self,
                               user_id: str,
@@ -121,86 +338,137 @@ class AuditAgent:
                               session_id: str = None,
                               processing_time_ms: int = None,
                               ip_address: str = None,
-                              user_agent: str = None) -> str:
-        # Remote API first
+                              user_agent: str = None,
+                              audit_id: str = None) -> str:
+        # Callers that answer before the write lands pass their own id
+        audit_id = audit_id or str(uuid.uuid4())
+
+        # Remote API first: queued for the bulk sender, so the id is assigned client-side
         if self.api_enabled:
-            try:
-                payload = {
-                    "user_id": user_id,
-                    "content": content,
-                    "content_type": content_type,
-                    "classification": classification,
-                    "risk_result": risk_result,
-                    "action_result": action_result,
-                    "nlp_analysis": nlp_analysis,
-                    "session_id": session_id,
-                    "processing_time_ms": processing_time_ms,
-                    "ip_address": ip_address,
-                    "user_agent": user_agent,
-                    "timestamp": datetime.now().isoformat()
-                }
+            self._remote_queue.put_nowait({
+                "audit_id": audit_id,
+                "user_id": user_id,
+                "content": content,
+                "content_type": content_type,
+                "classification": classification,
+                "risk_result": risk_result,
+                "action_result": action_result,
+                "nlp_analysis": nlp_analysis,
+                "session_id": session_id,
+                "processing_time_ms": processing_time_ms,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                # Raw epoch seconds here; the sender formats ISO off the request path
+                "timestamp": time.time()
+            })
+            return audit_id
 
-                # Optional Gemini summary enrichment
-                if os.getenv("AUDIT_USE_GEMINI_SUMMARY", "false").lower() == "true":
-                    try:
-                        decision_payload = {
-                            "user_id": user_id,
-                            "content_preview": (content[:200] + "...") if content and len(content) > 200 else (content or ""),
-                            "content_type": content_type,
-                            "classification": classification,
-                            "risk_result": risk_result,
-                            "action_result": action_result,
-                        }
-                        summary_text = self._summarize_decision_with_gemini(decision_payload)
-                        if summary_text:
-                            if not payload.get("nlp_analysis"):
-                                payload["nlp_analysis"] = {}
-                            payload["nlp_analysis"]["gemini_summary"] = summary_text
-                    except Exception:
-                        pass
-
-                resp = self._post("/audit/log", json=payload)
-                if resp and isinstance(resp, dict) and resp.get("audit_id"):
-                    return resp["audit_id"]
-            except Exception:
-                pass
+        self._enqueue_audit_row(
+            audit_id, datetime.now(), user_id, content, content_type, classification,
+            risk_result, action_result, nlp_analysis, session_id,
+            processing_time_ms, ip_address, user_agent
+        )
+        return audit_id
+
+    def _enqueue_audit_row(self,
+                           audit_id: str,
+                           timestamp: datetime,
+                           user_id: str,
+                           content: str,
+                           content_type: str,
+                           classification: Dict[str, float],
+                           risk_result: Dict[str, Any],
+                           action_result: Dict[str, Any],
+                           nlp_analysis: Dict[str, Any] = None,
+                           session_id: str = None,
+                           processing_time_ms: int = None,
+                           ip_address: str = None,
+                           user_agent: str = None):
+        # audit_id is already a random uuid4, no need to hash it for images
+        content_hash = f"image:{audit_id}" if content_type == 'image' else self.generate_content_hash(content)
+
+        classification_json = _dumps(classification)
+        actions_json = _dumps(action_result.get('actions', []))
+        policies_json = _dumps(action_result.get('policies', []))
+        nlp_json = _dumps(nlp_analysis) if nlp_analysis else None
 
-        # Local insert
-        audit_id = str(uuid.uuid4())
-        content_hash = self.generate_content_hash(f"image_{audit_id}") if content_type == 'image' else self.generate_content_hash(content)
-        timestamp = datetime.now()
+        content_preview = f"[Image Content - {content_type}]" if content_type == 'image' else (content[:100] + "..." if len(content) > 100 else content)
 
-        classification_json = json.dumps(classification)
-        actions_json = json.dumps(action_result.get('actions', []))
-        policies_json = json.dumps(action_result.get('policies', []))
-        nlp_json = json.dumps(nlp_analysis) if nlp_analysis else None
+        self._enqueue(_SQL_INSERT_AUDIT, (
+            audit_id, timestamp, user_id, session_id, content_hash,
+            content_type, content_preview, risk_result.get('score', 0.0),
+            risk_result.get('level', 'Unknown'), classification_json,
+            actions_json, policies_json, nlp_json, processing_time_ms,
+            ip_address, user_agent
+        ))
+
+    def _send_loop(self):
+        while True:
+            batch = [self._remote_queue.get()]
+            deadline = time.monotonic() + self.bulk_interval
+            while len(batch) < self.bulk_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._remote_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: List[Dict[str, Any]]):
+        events = [{**payload, "timestamp": datetime.fromtimestamp(payload["timestamp"]).isoformat()} for payload in batch]
+        sent = batch
+        if self.bulk_supported:
+            try:
+                self._post("/audit/log/bulk", json={"events": events})
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 405):
+                    self._keep_local(batch)
+                    return
+                print("Audit API has no /audit/log/bulk; sending decisions one by one")
+                self.bulk_supported = False
+            except Exception:
+                # Remote unavailable: keep the decisions in the local audit log instead
+                self._keep_local(batch)
+                return
+        if not self.bulk_supported:
+            sent = []
+            for payload, event in zip(batch, events):
+                try:
+                    self._post("/audit/log", json=event)
+                    sent.append(payload)
+                except Exception:
+                    self._keep_local([payload])
+
+        # Optional Gemini summary enrichment, patched onto each record in the background
+        if self._gemini_pool:
+            for payload in sent:
+                content = payload["content"]
+                decision_payload = {
+                    "user_id": payload["user_id"],
+                    "content_preview": (content[:200] + "...") if content and len(content) > 200 else (content or ""),
+                    "content_type": payload["content_type"],
+                    "classification": payload["classification"],
+                    "risk_result": payload["risk_result"],
+                    "action_result": payload["action_result"],
+                }
+                self._gemini_pool.submit(self._enrich_with_gemini_summary, payload["audit_id"], decision_payload)
 
-        content_preview = f"[Image Content - {content_type}]" if content_type == 'image' else (content[:100] + "..." if len(content) > 100 else content)
+    def _keep_local(self, batch: List[Dict[str, Any]]):
+        for payload in batch:
+            self._enqueue_audit_row(**{**payload, "timestamp": datetime.fromtimestamp(payload["timestamp"])})
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''
-                INSERT INTO audit_logs (
-                    audit_id, timestamp, user_id, session_id, content_hash,
-                    content_type, content_preview, risk_score, risk_level,
-                    classification_scores, actions_taken, policies_applied,
-                    nlp_analysis, processing_time_ms, ip_address, user_agent
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                audit_id, timestamp, user_id, session_id, content_hash,
-                content_type, content_preview, risk_result.get('score', 0.0),
-                risk_result.get('level', 'Unknown'), classification_json,
-                actions_json, policies_json, nlp_json, processing_time_ms,
-                ip_address, user_agent
-            ))
-            conn.commit()
-            return audit_id
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+    def flush_remote(self):
+        """Send every queued moderation decision to the audit API now."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._remote_queue.get_nowait())
+            except queue.Empty:
+                break
+        for i in range(0, len(batch), self.bulk_size):
+            self._send_batch(batch[i:i + self.bulk_size])
 
     def log_agent_decision(self,
                           audit_id: str,
@@ -227,25 +495,11 @@ class AuditAgent:
             except Exception:
                 pass
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''
-                INSERT INTO agent_decisions (
-                    audit_id, agent_name, decision_type, input_data,
-                    output_data, confidence_score, processing_time_ms
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                audit_id, agent_name, decision_type,
-                json.dumps(input_data), json.dumps(output_data),
-                confidence_score, processing_time_ms
-            ))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        self._enqueue(_SQL_INSERT_AGENT, (
+            audit_id, agent_name, decision_type,
+            _dumps(input_data), _dumps(output_data),
+            confidence_score, processing_time_ms
+        ))
 
     def log_system_event(self,
                         event_type: str,
@@ -268,23 +522,21 @@ class AuditAgent:
             except Exception:
                 pass
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''
-                INSERT INTO system_events (
-                    event_type, event_description, severity, user_id, metadata
-                ) VALUES (?, ?, ?, ?, ?)
-            ''', (
-                event_type, event_description, severity, user_id,
-                json.dumps(metadata) if metadata else None
-            ))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        self._enqueue(_SQL_INSERT_EVENT, (
+            event_type, event_description, severity, user_id,
+            _dumps(metadata) if metadata else None
+        ))
+
+    # --- asyncio entry points ---
+    async def alog_moderation_decision(self, *args, **kwargs) -> str:
+        # Only queues the record (bulk sender or local batch writer), so it never blocks the loop
+        return self.log_moderation_decision(*args, **kwargs)
+
+    async def alog_agent_decision(self, *args, **kwargs):
+        await asyncio.to_thread(self.log_agent_decision, *args, **kwargs)
+
+    async def alog_system_event(self, *args, **kwargs):
+        await asyncio.to_thread(self.log_system_event, *args, **kwargs)
 
     def get_audit_summary(self, days: int = 30) -> Dict[str, Any]:
         if self.api_enabled:
@@ -295,81 +547,60 @@ class AuditAgent:
             except Exception:
                 pass
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT COUNT(*) FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
-        total_decisions = cursor.fetchone()[0]
-
-        cursor.execute('''
-            SELECT content_type, COUNT(*) FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-            GROUP BY content_type
-        '''.format(days))
-        content_type_distribution = dict(cursor.fetchall())
-
-        cursor.execute('''
-            SELECT risk_level, COUNT(*) FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-            GROUP BY risk_level
-        '''.format(days))
-        risk_distribution = dict(cursor.fetchall())
-
-        cursor.execute('''
-            SELECT AVG(risk_score) FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
-        avg_risk_score = cursor.fetchone()[0] or 0.0
-
-        cursor.execute('''
-            SELECT classification_scores FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
-        category_scores = []
-        for row in cursor.fetchall():
-            try:
-                scores = json.loads(row[0])
-                category_scores.append(scores)
-            except Exception:
-                continue
-
-        category_averages = {}
-        categories = ['violence', 'hate_speech', 'threat', 'sexual', 'profanity', 'spam', 'normal']
-        for category in categories:
-            scores = [s.get(category, 0) for s in category_scores if s.get(category) is not None]
-            category_averages[category] = round(sum(scores) / len(scores), 3) if scores else 0
-
-        cursor.execute('''
-            SELECT actions_taken, COUNT(*) FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-            GROUP BY actions_taken
-            ORDER BY COUNT(*) DESC
-            LIMIT 5
-        '''.format(days))
-        common_actions = cursor.fetchall()
-
-        cursor.execute('''
-            SELECT DATE(timestamp) as date, COUNT(*) as count 
-            FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-            GROUP BY DATE(timestamp)
-            ORDER BY date
-        '''.format(days))
-        daily_activity = cursor.fetchall()
-
-        cursor.execute('''
-            SELECT strftime('%H', timestamp) as hour, COUNT(*) as count 
-            FROM audit_logs 
-            WHERE timestamp >= datetime('now', '-{} days')
-            GROUP BY strftime('%H', timestamp)
-            ORDER BY hour
-        '''.format(days))
-        hourly_activity = cursor.fetchall()
-
-        conn.close()
+        self.flush()
+        conn = self._conn()
+
+        # Filter the date window once into a temp table; every aggregate below reads from it
+        conn.execute("DROP TABLE IF EXISTS temp.recent_audit")
+        conn.execute('''
+            CREATE TEMP TABLE recent_audit AS
+            SELECT content_type, risk_level, risk_score, classification_scores, actions_taken, timestamp
+            FROM audit_logs
+            WHERE timestamp >= datetime('now', ?)
+        ''', (f'-{int(days)} days',))
+        try:
+            total_decisions, avg_risk_score = conn.execute(
+                "SELECT COUNT(*), AVG(risk_score) FROM recent_audit"
+            ).fetchone()
+            avg_risk_score = avg_risk_score or 0.0
+
+            content_type_distribution = dict(conn.execute(
+                "SELECT content_type, COUNT(*) FROM recent_audit GROUP BY content_type"
+            ))
+
+            risk_distribution = dict(conn.execute(
+                "SELECT risk_level, COUNT(*) FROM recent_audit GROUP BY risk_level"
+            ))
+
+            # AVG skips NULLs, so categories missing from a row don't count towards its average
+            category_averages = {
+                category: round(avg, 3) if avg is not None else 0
+                for category, avg in zip(_SUMMARY_CATEGORIES, conn.execute(_CATEGORY_AVERAGES_SQL).fetchone())
+            }
+
+            common_actions = conn.execute('''
+                SELECT json(actions_taken), COUNT(*) FROM recent_audit
+                WHERE json_valid(actions_taken)
+                GROUP BY json(actions_taken)
+                ORDER BY COUNT(*) DESC
+                LIMIT 5
+            ''').fetchall()
+
+            daily_activity = conn.execute('''
+                SELECT DATE(timestamp) as date, COUNT(*) as count
+                FROM recent_audit
+                GROUP BY DATE(timestamp)
+                ORDER BY date
+            ''').fetchall()
+
+            hourly_activity = conn.execute('''
+                SELECT strftime('%H', timestamp) as hour, COUNT(*) as count
+                FROM recent_audit
+                GROUP BY strftime('%H', timestamp)
+                ORDER BY hour
+            ''').fetchall()
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.recent_audit")
 
         return {
             "total_decisions": total_decisions,
@@ -388,7 +619,9 @@ class AuditAgent:
                                 risk_level: str = None,
                                 start_date: str = None,
                                 end_date: str = None,
-                                limit: int = 100) -> List[Dict[str, Any]]:
+                                limit: int = 100,
+                                columns: Optional[List[str]] = None,
+                                parse_json: bool = True) -> List[Dict[str, Any]]:
         if self.api_enabled:
             try:
                 params = {
@@ -400,14 +633,37 @@ class AuditAgent:
                 }
                 data = self._get("/audit/trail", params={k: v for k, v in params.items() if v is not None})
                 if isinstance(data, list):
+                    if columns:
+                        return [{c: record.get(c) for c in columns} for record in data]
                     return data
             except Exception:
                 pass
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM audit_logs WHERE 1=1"
+        return list(self.iter_detailed_audit_trail(user_id, risk_level, start_date, end_date, limit, columns, parse_json))
+
+    def iter_detailed_audit_trail(self,
+                                  user_id: str = None,
+                                  risk_level: str = None,
+                                  start_date: str = None,
+                                  end_date: str = None,
+                                  limit: int = 100,
+                                  columns: Optional[List[str]] = None,
+                                  parse_json: bool = True):
+        """Yield local audit records one at a time instead of building a list.
+
+        columns limits the SELECT to the given audit_logs columns (all by default);
+        parse_json=False leaves the JSON columns as raw strings.
+        """
+        columns = list(columns) if columns else list(_AUDIT_COLUMNS)
+        unknown = [c for c in columns if c not in _AUDIT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown audit columns: {', '.join(unknown)}")
+        json_columns = [c for c in columns if c in _AUDIT_JSON_COLUMNS] if parse_json else []
+
+        self.flush()
+        conn = self._conn()
+
+        query = f"SELECT {', '.join(columns)} FROM audit_logs WHERE 1=1"
         params = []
         if user_id:
             query += " AND user_id = ?"
@@ -424,20 +680,14 @@ class AuditAgent:
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
 
-        cursor.execute(query, params)
-        columns = [description[0] for description in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            record = dict(zip(columns, row))
-            record['classification_scores'] = json.loads(record['classification_scores'])
-            record['actions_taken'] = json.loads(record['actions_taken'])
-            record['policies_applied'] = json.loads(record['policies_applied'])
-            if record['nlp_analysis']:
-                record['nlp_analysis'] = json.loads(record['nlp_analysis'])
-            results.append(record)
-
-        conn.close()
-        return results
+        cursor = conn.execute(query, params)
+        cursor.row_factory = sqlite3.Row
+        for row in cursor:
+            record = dict(row)
+            for column in json_columns:
+                if record[column]:
+                    record[column] = orjson.loads(record[column])
+            yield record
 
     def export_audit_report(self,
                            format_type: str = "csv",
@@ -447,10 +697,8 @@ class AuditAgent:
             try:
                 params = {"format": format_type, "start_date": start_date, "end_date": end_date}
                 url = self._build_url("/audit/export")
-                headers = self._headers()
                 resp = self.session.get(
                     url,
-                    headers=headers,
                     params={k: v for k, v in params.items() if v is not None},
                     timeout=self.api_timeout,
                     verify=self.api_verify_tls
@@ -460,37 +708,60 @@ class AuditAgent:
             except Exception:
                 pass
 
-        import csv
-        import io
-        audit_data = self.get_detailed_audit_trail(start_date=start_date, end_date=end_date, limit=10000)
         if format_type.lower() == "csv":
-            output = io.StringIO()
-            if audit_data:
-                import csv as _csv
-                writer = _csv.DictWriter(output, fieldnames=audit_data[0].keys())
-                writer.writeheader()
-                for row in audit_data:
-                    flat_row = {}
-                    for key, value in row.items():
-                        if isinstance(value, (dict, list)):
-                            flat_row[key] = json.dumps(value)
-                        else:
-                            flat_row[key] = value
-                    writer.writerow(flat_row)
-            return output.getvalue()
-        elif format_type.lower() == "json":
-            return json.dumps(audit_data, indent=2, default=str)
+            return "".join(self._iter_local_csv(start_date, end_date))
+
+        audit_data = self.get_detailed_audit_trail(start_date=start_date, end_date=end_date, limit=10000)
+        if format_type.lower() == "json":
+            return _ascii_json(orjson.dumps(audit_data, option=orjson.OPT_INDENT_2, default=str).decode())
         elif format_type.lower() == "pdf":
             return self._generate_pdf_report(audit_data, start_date, end_date)
         else:
             raise ValueError("Unsupported format. Use 'csv', 'json', or 'pdf'")
 
+    def iter_audit_csv(self, start_date: str = None, end_date: str = None):
+        """Yield the CSV audit report line by line, for streaming responses."""
+        if self.api_enabled:
+            yield self.export_audit_report("csv", start_date, end_date)
+            return
+        yield from self._iter_local_csv(start_date, end_date)
+
+    def iter_audit_json(self, start_date: str = None, end_date: str = None, chunk_rows: int = 200):
+        """Yield the JSON audit report in chunks of rows; the joined text equals export_audit_report's."""
+        if self.api_enabled:
+            yield self.export_audit_report("json", start_date, end_date)
+            return
+        parts = []
+        sep = "[\n  "
+        for row in self.iter_detailed_audit_trail(start_date=start_date, end_date=end_date, limit=10000):
+            # Rows sit one level inside the array, so their indented lines shift by two spaces
+            parts.append(sep + _ascii_json(orjson.dumps(row, option=orjson.OPT_INDENT_2, default=str).decode()).replace("\n", "\n  "))
+            sep = ",\n  "
+            if len(parts) >= chunk_rows:
+                yield "".join(parts)
+                parts = []
+        parts.append("[]" if sep == "[\n  " else "\n]")
+        yield "".join(parts)
+
+    def _iter_local_csv(self, start_date: str = None, end_date: str = None):
+        writer = csv.writer(_LineEcho())
+        header = None
+        for row in self.iter_detailed_audit_trail(start_date=start_date, end_date=end_date, limit=10000):
+            if header is None:
+                header = list(row.keys())
+                yield writer.writerow(header)
+            yield writer.writerow([
+                _dumps(value) if isinstance(value, (dict, list)) else value
+                for value in row.values()
+            ])
+
     # --- API helpers ---
     def _build_url(self, path: str) -> str:
         base = (self.api_base_url or "").rstrip("/")
         return f"{base}{path}"
 
     def _headers(self) -> Dict[str, str]:
+        # Static headers, applied once to the session in __init__
         headers = {"Content-Type": "application/json"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
@@ -498,11 +769,9 @@ class AuditAgent:
 
     def _post(self, path: str, json: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         url = self._build_url(path)
-        headers = self._headers()
-        headers["Idempotency-Key"] = str(uuid.uuid4())
         resp = self.session.post(
             url,
-            headers=headers,
+            headers={"Idempotency-Key": uuid.uuid4().hex},
             json=json,
             timeout=self.api_timeout,
             verify=self.api_verify_tls
@@ -517,7 +786,6 @@ class AuditAgent:
         url = self._build_url(path)
         resp = self.session.get(
             url,
-            headers=self._headers(),
             params=params,
             timeout=self.api_timeout,
             verify=self.api_verify_tls
@@ -534,11 +802,35 @@ class AuditAgent:
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def _enrich_with_gemini_summary(self, audit_id: str, decision: dict):
+        try:
+            summary_text = self._summarize_decision_with_gemini(decision)
+            if summary_text:
+                self._post("/audit/enrich", json={"audit_id": audit_id, "gemini_summary": summary_text})
+        except Exception:
+            pass
+
     def _summarize_decision_with_gemini(self, decision: dict) -> str:
+        key = hashlib.blake2b(
+            orjson.dumps(decision, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16
+        ).digest()
+        with self._gemini_cache_lock:
+            cached = self._gemini_cache.get(key)
+        if cached is not None:
+            return cached
+
+        summary = self._generate_gemini_summary(decision)
+        if summary:
+            with self._gemini_cache_lock:
+                self._gemini_cache[key] = summary
+        return summary
+
+    def _generate_gemini_summary(self, decision: dict) -> str:
         try:
-            from google import genai
             from google.genai import types
-            client = genai.Client()
+            from agents.classifier_agent import get_genai_client
+            client = get_genai_client(os.getenv("GEMINI_API_KEY"))
             instruction = (
                 "Summarize this moderation decision in 2-3 sentences. "
                 "Highlight risk level, top categories, and actions taken. Respond in plain text."
@@ -1,8 +1,24 @@
 # agents/risk_agent.py
 import json
-import uuid
+import random
 import re
-from typing import Dict, Any, Optional
+from operator import itemgetter
+from typing import Dict, Any, List, Optional
+
+# Short per-evaluation ids: seeded once from os.urandom, so no syscall per call
+_audit_rng = random.Random()
+
+# Text-boost rule groups, fused into one regex so each text is scanned once.
+# Zero-width lookahead matches keep overlapping hits from different groups visible.
+_TEXT_BOOSTS = {"threat": 0.25, "sexual_request": 0.20}
+_TEXT_BOOST_RE = re.compile("(?=" + "|".join((
+    r"(?P<threat>\bkill you\b|\bi will kill\b|\bi will hurt\b"
+    r"|\b(i want to die|kill myself|suicide)\b|\bmurder\b|\brape\b)",
+    r"(?P<sexual_request>\bsend nudes\b|\bsend pics\b|\bshow me nude\b|\bsend pictures\b)",
+)) + ")")
+
+# Every _TEXT_BOOST_RE alternative contains one of these substrings; keep in sync
+_TEXT_BOOST_PREFILTER = ("kill", "hurt", "die", "suicide", "murder", "rape", "send", "nude")
 
 class RiskAgent:
     """
@@ -45,72 +61,86 @@ class RiskAgent:
             except Exception:
                 pass
 
-        # Patterns for small text-based boosts
-        self._threat_patterns = [
-            r"\bkill you\b", r"\bi will kill\b", r"\bi will hurt\b",
-            r"\b(i want to die|kill myself|suicide)\b", r"\bmurder\b", r"\brape\b"
-        ]
-        self._sexual_request_patterns = [
-            r"\bsend nudes\b", r"\bsend pics\b", r"\bshow me nude\b", r"\bsend pictures\b"
-        ]
+        # Re-run if thresholds/weights are changed after construction
+        self._freeze_tables()
 
-    def evaluate(self, classification: Dict[str, Any], text: str = "") -> Dict[str, Any]:
+
+    def evaluate(self, classification: Dict[str, Any], text: str = "", include_reasons: bool = True) -> Dict[str, Any]:
+        """include_reasons=False skips formatting the human-readable reasons (returned as [])."""
+        return self._evaluate(classification, text, include_reasons)
+
+    def evaluate_batch(self, classifications: List[Dict[str, Any]], texts: Optional[List[str]] = None,
+                       include_reasons: bool = True) -> List[Dict[str, Any]]:
+        """Evaluate many classifier outputs in one call."""
+        if texts is None:
+            texts = [""] * len(classifications)
+        return [self._evaluate(c, t, include_reasons) for c, t in zip(classifications, texts, strict=True)]
+
+    def _freeze_tables(self):
+        # Parallel tuples in a fixed category order, walked with zip() on every evaluate;
+        # the dicts stay the config-facing view
+        self._cat_order = tuple(self.weights)
+        self._weights_arr = tuple(self.weights[c] for c in self._cat_order)
+        self._thresholds_arr = tuple(self.thresholds.get(c, 0.4) for c in self._cat_order)
+
+    def _evaluate(self, classification: Dict[str, Any], text: str, include_reasons: bool = True) -> Dict[str, Any]:
         text_l = (text or "").lower()
         normalized = {k: float(v or 0.0) for k, v in (classification or {}).items()}
 
         risk_score = 0.0
         reasons = []
+        tripped = False
         contributions = {}
 
-        for cat, weight in self.weights.items():
+        for cat, weight, threshold in zip(self._cat_order, self._weights_arr, self._thresholds_arr):
             cat_score = normalized.get(cat, 0.0)
             contribution = round(cat_score * weight, 4)
             contributions[cat] = contribution
-            threshold = self.thresholds.get(cat, 0.4)
             if cat_score > threshold:
                 risk_score += contribution
-                reasons.append(f"{cat} > {threshold:.2f} (score {cat_score:.2f})")
+                tripped = True
+                if include_reasons:
+                    reasons.append(f"{cat} > {threshold:.2f} (score {cat_score:.2f})")
 
         # Text-based boost
-        risk_score += self._evaluate_text_features(text_l)
+        risk_score += self._evaluate_text_features(text_l, text or "")
         risk_score = min(risk_score, 1.0)
 
         level = self._get_level(risk_score)
         # Ensure anything tripping a category threshold is not marked Low
-        if level == "Low" and reasons:
+        if level == "Low" and tripped:
             level = "Medium"
 
         # Build top contributors list for downstream action selection
-        top_contributors = []
-        for cat, contribution in sorted(contributions.items(), key=lambda x: x[1], reverse=True):
-            top_contributors.append({
+        # (only the five that are returned; contributions are already rounded)
+        top_contributors = [
+            {
                 "category": cat,
                 "score": round(normalized.get(cat, 0.0), 4),
-                "contribution": round(contribution, 4)
-            })
+                "contribution": contribution
+            }
+            for cat, contribution in sorted(contributions.items(), key=itemgetter(1), reverse=True)[:5]
+        ]
 
         return {
             "score": round(risk_score, 4),
             "level": level,
             "reasons": reasons,
-            "audit_id": str(uuid.uuid4())[:8],
+            "audit_id": f"{_audit_rng.getrandbits(32):08x}",
             "contributions": contributions,
-            "top_contributors": top_contributors[:5]
+            "top_contributors": top_contributors
         }
 
-    def _evaluate_text_features(self, text_l: str) -> float:
+    def _evaluate_text_features(self, text_l: str, text: str = "") -> float:
         boost = 0.0
-        for patt in self._threat_patterns:
-            if re.search(patt, text_l):
-                boost += 0.25
-                break
-        for patt in self._sexual_request_patterns:
-            if re.search(patt, text_l):
-                boost += 0.20
-                break
+        # Cheap substring check first; most texts never reach the regex
+        if any(lit in text_l for lit in _TEXT_BOOST_PREFILTER):
+            for group in {m.lastgroup for m in _TEXT_BOOST_RE.finditer(text_l)}:
+                boost += _TEXT_BOOSTS[group]
         if text_l.count("!") > 2:
             boost += 0.05
-        if text_l.isupper() and len(text_l) > 10:
+        # Caps check needs the original text; text_l is lowercased and never isupper()
+        if text.isupper() and len(text) > 10:
             boost += 0.10
         return min(boost, 1.0)
 
@@ -2,24 +2,37 @@
 """
 Simple Message Bus for Agent-to-Agent communication (in-process).
 Very small, synchronous implementation — suitable for demo/prototype.
+Safe to share between request threads: storage is split into lock-guarded shards.
 """
-from typing import Any, Dict
+import threading
+from typing import Any
+
+_SHARDS = 16
 
 class MessageBus:
     def __init__(self):
-        # messages keyed by receiver id (latest wins)
-        self._messages: Dict[str, Dict[str, Any]] = {}
+        # messages keyed by receiver id (latest wins), striped across shards by receiver hash
+        self._shards = [{} for _ in range(_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(_SHARDS)]
+
+    def _shard(self, receiver: str) -> int:
+        return hash(receiver) & (_SHARDS - 1)
 
     def send(self, sender: str, receiver: str, data: Any) -> None:
         """Send a message from sender -> receiver."""
-        self._messages[receiver] = {"from": sender, "data": data}
+        i = self._shard(receiver)
+        with self._locks[i]:
+            self._shards[i][receiver] = {"from": sender, "data": data}
 
     def receive(self, receiver: str) -> Any:
         """Retrieve the latest message for `receiver`. Returns the `data` or None."""
-        msg = self._messages.get(receiver)
+        i = self._shard(receiver)
+        with self._locks[i]:
+            msg = self._shards[i].get(receiver)
         return msg["data"] if msg else None
 
     def clear(self, receiver: str) -> None:
         """Optional: clear stored message for a receiver."""
-        if receiver in self._messages:
-            del self._messages[receiver]
+        i = self._shard(receiver)
+        with self._locks[i]:
+            self._shards[i].pop(receiver, None)
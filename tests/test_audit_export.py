@@ -0,0 +1,47 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ.pop("AUDIT_API_BASE_URL", None)
+os.environ.setdefault("GEMINI_API_KEY", "")
+
+from agents.audit_agent import AuditAgent
+
+
+class AuditExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.agent = AuditAgent(db_path=os.path.join(self.tmpdir, "audit.db"))
+        for i, text in enumerate(["café au lait", "日本語のテキスト", "emoji 😀 and \x7f", "plain ascii"]):
+            self.agent.log_moderation_decision(
+                user_id=f"user_{i}",
+                content=text,
+                content_type="text",
+                classification={"toxicity": 0.1 * i, "spam": 0.0},
+                risk_result={"risk_level": "low", "risk_score": 0.1, "reasoning": f"résumé {text}"},
+                action_result={"action": "approve", "actions_taken": ["logged ✓"]},
+            )
+        self.agent.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_json_export_matches_stdlib_encoding(self):
+        trail = self.agent.get_detailed_audit_trail(limit=10000)
+        self.assertEqual(len(trail), 4)
+        exported = self.agent.export_audit_report("json")
+        self.assertEqual(exported, json.dumps(trail, indent=2, default=str))
+        self.assertTrue(exported.isascii())
+        self.assertEqual(json.loads(exported), trail)
+
+    def test_streamed_json_matches_export(self):
+        exported = self.agent.export_audit_report("json")
+        for chunk_rows in (1, 3, 200):
+            streamed = "".join(self.agent.iter_audit_json(chunk_rows=chunk_rows))
+            self.assertEqual(streamed, exported)
+
+
+if __name__ == "__main__":
+    unittest.main()
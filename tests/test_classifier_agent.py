@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+os.environ["GEMINI_API_KEY"] = ""
+
+from agents.classifier_agent import ClassifierAgent, BatchingDispatcher, ClassifierCache
+
+
+class FakeModels:
+    """Answers batch prompts through `shape` and single prompts with per-text scores."""
+
+    def __init__(self, scores, shape=lambda items: items):
+        self.scores = scores
+        self.shape = shape
+        self.stream_prompts = []
+        self.lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        items = []
+        for line in contents[1].splitlines():
+            item_id, text = line.split(": ", 1)
+            items.append({"id": item_id, **self.scores[json.loads(text)]})
+        return SimpleNamespace(text=json.dumps(self.shape(items)))
+
+    def generate_content_stream(self, model, contents, config=None):
+        with self.lock:
+            self.stream_prompts.append(contents)
+        text = next(t for t in self.scores if contents[1] == f"Text to analyze: \"{t}\"")
+        yield SimpleNamespace(text=json.dumps(self.scores[text]))
+
+
+def scores(spam):
+    return {"sexual": 0.0, "violence": 0.0, "hate_speech": 0.0, "profanity": 0.0, "spam": spam, "threat": 0.0}
+
+
+class ClassifyBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.texts = ["first text", "second text", "third text"]
+        self.scores = {"first text": scores(0.1), "second text": scores(0.2), "third text": scores(0.3)}
+
+    def agent(self, shape=lambda items: items):
+        agent = ClassifierAgent()
+        agent.demo_mode = False
+        agent.client = SimpleNamespace(models=FakeModels(self.scores, shape))
+        return agent
+
+    def assert_matched(self, results):
+        self.assertEqual([r["status"] for r in results], ["success"] * 3)
+        self.assertEqual([r["classification"]["spam"] for r in results], [0.1, 0.2, 0.3])
+
+    def test_reordered_response_is_matched_by_id(self):
+        agent = self.agent(lambda items: items[::-1])
+        self.assert_matched(agent.classify_batch(self.texts))
+        self.assertEqual(agent.client.models.stream_prompts, [])
+
+    def test_short_response_falls_back_to_single_requests(self):
+        agent = self.agent(lambda items: items[1:])
+        self.assert_matched(agent.classify_batch(self.texts))
+        self.assertEqual(len(agent.client.models.stream_prompts), 1)
+
+    def test_unknown_and_duplicate_ids_fall_back(self):
+        def shape(items):
+            items[0]["id"] = "not-an-id"
+            return items + [dict(items[2], spam=0.9)]
+        agent = self.agent(shape)
+        self.assert_matched(agent.classify_batch(self.texts))
+        self.assertEqual(len(agent.client.models.stream_prompts), 2)
+
+
+class StreamedText:
+    def __init__(self, text):
+        self.text = text
+
+    def generate_content_stream(self, model, contents, config=None):
+        if self.text:
+            yield SimpleNamespace(text=self.text)
+
+
+class CachingTest(unittest.TestCase):
+    def agent(self, raw_text):
+        agent = ClassifierAgent()
+        agent.demo_mode = False
+        agent.client = SimpleNamespace(models=StreamedText(raw_text))
+        return agent
+
+    def test_empty_response_is_an_error(self):
+        agent = self.agent("")
+        self.assertEqual(agent.classify_content("some text")["status"], "error")
+        self.assertIsNone(agent.cached_result("some text"))
+
+    def test_loose_and_partial_answers_are_not_cached(self):
+        for raw_text in ("spam: 0.4, threat: 0.1", '{"spam": 0.4}', "Sorry, I can't help with that."):
+            agent = self.agent(raw_text)
+            self.assertEqual(agent.classify_content("some text")["status"], "success")
+            self.assertIsNone(agent.cached_result("some text"), raw_text)
+
+    def test_complete_answer_is_cached(self):
+        agent = self.agent(json.dumps(scores(0.4)))
+        agent.classify_content("some text")
+        self.assertEqual(agent.cached_result("some text")["classification"]["spam"], 0.4)
+
+
+class PersistentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.keys = list(scores(0.0))
+        self.cache = ClassifierCache(os.path.join(self.tmpdir, "classifier.db"), ttl=60, keys=self.keys)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def result(self, model_output):
+        return {"status": "success", "classification": scores(0.0), "model_output": model_output}
+
+    def test_only_complete_answers_are_persisted(self):
+        self.cache.put("complete", self.result(json.dumps(scores(0.4))))
+        self.cache.put("loose", self.result("spam: 0.4"))
+        self.cache.put("partial", self.result('{"spam": 0.4}'))
+        self.cache.put("error", {"status": "error", "message": "boom"})
+        self.cache.flush()
+        self.assertIsNotNone(self.cache.get("complete"))
+        for key in ("loose", "partial", "error"):
+            self.assertIsNone(self.cache.get(key), key)
+
+    def test_invalid_stored_rows_are_ignored(self):
+        conn = self.cache._conn()
+        conn.execute("INSERT INTO classifier_cache VALUES (?, ?, strftime('%s', 'now'))",
+                     ("old", json.dumps(self.result(""))))
+        conn.commit()
+        self.assertIsNone(self.cache.get("old"))
+
+
+class DispatcherTest(unittest.TestCase):
+    def test_each_text_gets_its_own_request(self):
+        texts = [f"text number {i}" for i in range(12)]
+        agent = ClassifierAgent()
+        agent.demo_mode = False
+        agent.client = SimpleNamespace(models=FakeModels({t: scores(i / 100) for i, t in enumerate(texts)}))
+        dispatcher = BatchingDispatcher(agent, workers=4)
+        futures = [dispatcher.enqueue(t) for t in texts]
+        results = [f.result(timeout=10) for f in futures]
+        self.assertEqual([r["classification"]["spam"] for r in results], [i / 100 for i in range(12)])
+        prompts = agent.client.models.stream_prompts
+        self.assertEqual(len(prompts), len(texts))
+        self.assertTrue(all(len(p) == 2 for p in prompts))
+
+
+if __name__ == "__main__":
+    unittest.main()
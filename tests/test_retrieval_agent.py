@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.retrieval_agent import RetrievalAgent
+
+
+class SimilarContentTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.agent = RetrievalAgent(db_path=os.path.join(self.tmpdir, "history.db"))
+        self.agent.store_moderation("You should see a therapist", {"toxicity": 0.0}, 0.0, [], "user_1")
+        self.agent.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_case_and_punctuation_changes_match(self):
+        results = self.agent.find_similar_content("you should   see a THERAPIST!!")
+        self.assertTrue(results[0]["normalized_match"])
+
+    def test_word_changes_do_not_match(self):
+        # A near-identical ratio, but different words
+        results = self.agent.find_similar_content("You should see a the rapist")
+        self.assertTrue(all(not item["normalized_match"] for item in results))
+        results = self.agent.find_similar_content("You should kill a therapist")
+        self.assertTrue(all(not item["normalized_match"] for item in results))
+
+    def test_long_texts_use_bounded_compare(self):
+        long_text = "word " * 2000
+        similarity, changed = RetrievalAgent._compare(long_text, long_text + "extra")
+        self.assertGreater(similarity, 0.99)
+        self.assertGreaterEqual(changed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
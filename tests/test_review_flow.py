@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+import unittest
+
+main = None
+
+
+def setUpModule():
+    global main
+    # main opens its SQLite files relative to the working directory at import time
+    os.chdir(tempfile.mkdtemp())
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ.pop("AUDIT_API_BASE_URL", None)
+    import main as main_module
+    main = main_module
+
+
+class ReviewFlowTest(unittest.TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+        # Slow audit writes keep the moderation row queued when the review arrives
+        self.original_log = main.audit_agent.log_moderation_decision
+
+        def slow_log(**kwargs):
+            time.sleep(0.3)
+            return self.original_log(**kwargs)
+        main.audit_agent.log_moderation_decision = slow_log
+
+    def tearDown(self):
+        main.audit_agent.log_moderation_decision = self.original_log
+
+    def test_moderate_then_review_immediately(self):
+        moderated = self.client.post("/moderate", data={"content": "click here to win a free prize"})
+        self.assertEqual(moderated.status_code, 200)
+        audit_id = moderated.get_json()["audit_id"]
+
+        review = self.client.post("/api/review/decision", json={"audit_id": audit_id, "decision": "reject"})
+        self.assertEqual(review.status_code, 200, review.get_json())
+        self.assertEqual(review.get_json()["status"], "success")
+
+
+    def moderate(self, text):
+        return self.client.post("/moderate", data={"content": text}).get_json()["audit_id"]
+
+    def test_trail_and_exports_include_queued_moderation(self):
+        audit_id = self.moderate("a queued moderation for the trail")
+        trail = self.client.get("/api/audit/trail?limit=5").get_json()
+        self.assertIn(audit_id, [row["audit_id"] for row in trail])
+
+        audit_id = self.moderate("a queued moderation for the export")
+        exported = self.client.get("/api/audit/export?format=csv").get_data(as_text=True)
+        self.assertIn(audit_id, exported)
+
+    def test_summary_is_fresh_on_miss_and_reused_within_ttl(self):
+        with main.dashboard_cache_lock:
+            main.dashboard_cache.clear()
+        before = self.client.get("/api/audit/summary?days=7").get_json()["total_decisions"]
+
+        self.moderate("first summary moderation")
+        # Cached within DASHBOARD_CACHE_TTL: the new decision is not counted yet (documented lag)
+        self.assertEqual(self.client.get("/api/audit/summary?days=7").get_json()["total_decisions"], before)
+
+        with main.dashboard_cache_lock:
+            main.dashboard_cache.clear()
+        # A cache miss waits for the queued write, so it is counted straight away
+        self.assertEqual(self.client.get("/api/audit/summary?days=7").get_json()["total_decisions"], before + 1)
+
+if __name__ == "__main__":
+    unittest.main()
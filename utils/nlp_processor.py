@@ -1,6 +1,53 @@
 # utils/nlp_processor.py
 import re
 from collections import defaultdict
+from functools import partial
+from typing import List
+
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_URL_RE = re.compile(r'https?://[^\s]+|www\.[^\s]+')
+# A leading \b stops re from skipping ahead to candidate characters, so patterns that would
+# open with \b<class> start with the class and check the boundary in a lookbehind instead
+_PHONE_RE = re.compile(r'\d(?<!\w\d)\d{2}[-.]?\d{3}[-.]?\d{4}\b')
+_SENTENCE_RE = re.compile(r'[^.!?]+')
+
+# Patterns opening with a run of capitalized words fail from every later word of a run
+# once they fail from its first, so those are only tried at run starts (see _findall_from_runs)
+_CAP_RUN = r'\b[A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*'
+_CAP_RUN_RE = re.compile(_CAP_RUN)
+
+def _findall_from_runs(pattern, text: str) -> List[str]:
+    """
+    Same result as pattern.findall(text) for a group-free pattern starting with _CAP_RUN.
+    A match from a later word of a run implies one from the run's first word, so a failed
+    attempt skips the rest of the run; plain findall retries every word, which is quadratic
+    in the run length (seconds on a long run of capitalized words).
+    """
+    found = []
+    pos = 0
+    while True:
+        run = _CAP_RUN_RE.search(text, pos)
+        if run is None:
+            return found
+        match = pattern.match(text, run.start())
+        if match:
+            found.append(match.group())
+            pos = match.end()
+        else:
+            pos = run.end()
+
+# Sentiment vocabulary; analyze_sentiment counts each word once if it appears anywhere
+_POSITIVE_WORDS = (
+    'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'love', 'like',
+    'safe', 'harmless', 'helpful', 'supportive'
+)
+_GENERAL_NEGATIVE_WORDS = (
+    'bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'angry', 'mad'
+)
+_SAFETY_NEGATIVE_WORDS = (
+    'violence', 'violent', 'kill', 'murder', 'threat', 'threaten', 'attack', 'harm', 'hurt',
+    'shoot', 'stab', 'bomb', 'rape', 'abuse', 'terror', 'genocide', 'slur', 'lynch', 'execute'
+)
 
 class NLPProcessor:
     def __init__(self):
@@ -8,7 +55,7 @@ class NLPProcessor:
         self.entity_patterns = {
             "persons": [
                 r'\b(?:Mr|Ms|Mrs|Dr)\.?\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b',
-                r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b'
+                r'[A-Z](?<!\w[A-Z])[a-z]+\s+[A-Z][a-z]+\b'  # = \b[A-Z][a-z]+\s+[A-Z][a-z]+\b, see _PHONE_RE
             ],
             "organizations": [
                 r'\b(?:Inc|LLC|Corp|Corporation|Company|Ltd|Limited)\b',
@@ -20,6 +67,26 @@ class NLPProcessor:
                 r'\b(?:New|Los|San|Las)\s+[A-Z][a-zA-Z]+\b'
             ]
         }
+        # Substrings every match of the pattern at the same position contains (None: no
+        # such literal); a text without any of them skips that scan. Keep in sync.
+        self.entity_prefilters = {
+            "persons": [("Mr", "Ms", "Dr"), None],
+            "organizations": [("Inc", "LLC", "Corp", "Company", "Ltd", "Limited"), ("Company", "Corp", "Inc", "LLC")],
+            "locations": [
+                ("St", "Ave", "Road", "Rd", "Boulevard", "Blvd", "Drive", "Dr", "Lane", "Ln"),
+                ("City", "Town", "Village"),
+                ("New", "Los", "San", "Las")
+            ]
+        }
+        # Compiled once into (prefilter, findall-style callable); extract_entities runs for every moderated text
+        self._compiled_patterns = [
+            (entity_type, [
+                (prefilter,
+                 partial(_findall_from_runs, re.compile(p)) if p.startswith(_CAP_RUN) else re.compile(p).findall)
+                for p, prefilter in zip(patterns, self.entity_prefilters[entity_type])
+            ])
+            for entity_type, patterns in self.entity_patterns.items()
+        ]
     
     def extract_entities(self, text: str) -> dict:
         """Extract named entities using rule-based patterns"""
@@ -30,34 +97,33 @@ class NLPProcessor:
             "other": []
         }
         
-        # Email detection
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+        # Email detection (every match contains an '@')
+        emails = _EMAIL_RE.findall(text) if '@' in text else ()
         if emails:
             entities["other"].extend([f"Email: {email}" for email in emails])
         
-        # URL detection
-        urls = re.findall(r'https?://[^\s]+|www\.[^\s]+', text)
+        # URL detection (every match starts with 'http' or 'www.')
+        urls = _URL_RE.findall(text) if 'http' in text or 'www.' in text else ()
         if urls:
             entities["other"].extend([f"URL: {url}" for url in urls])
         
         # Phone numbers
-        phones = re.findall(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', text)
+        phones = _PHONE_RE.findall(text)
         if phones:
             entities["other"].extend([f"Phone: {phone}" for phone in phones])
         
         # Rule-based entity extraction
-        for entity_type, patterns in self.entity_patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, text)
-                for match in matches:
-                    if match not in entities[entity_type]:
-                        entities[entity_type].append(match)
-        
-        # Simple person name detection (capitalized words in sequence)
-        potential_names = re.findall(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b', text)
-        for name in potential_names:
-            if name not in entities["persons"] and len(name.split()) == 2:
-                entities["persons"].append(name)
+        # (the "First Last" persons pattern also covers simple capitalized-name detection)
+        for entity_type, finders in self._compiled_patterns:
+            found = entities[entity_type]
+            seen = set(found)
+            for prefilter, findall in finders:
+                if prefilter and not any(literal in text for literal in prefilter):
+                    continue
+                for match in findall(text):
+                    if match not in seen:
+                        seen.add(match)
+                        found.append(match)
         
         # Clean up empty categories
         for category in list(entities.keys()):
@@ -66,46 +132,53 @@ class NLPProcessor:
         
         return entities
     
+    def extract_entities_batch(self, texts: List[str]) -> List[dict]:
+        """Extract entities for several texts; results are in input order"""
+        return [self.extract_entities(text) for text in texts]
+    
     def summarize_content(self, text: str, max_sentences: int = 2) -> str:
         """Generate a simple content summary using sentence extraction"""
         if not text or len(text.strip()) == 0:
             return "No content to summarize."
         
-        # Split into sentences
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # Walk sentences lazily; only the first one and whether there are more than
+        # max_sentences matter, so long texts never build the full sentence list
+        first_sentence = None
+        count = 0
+        for match in _SENTENCE_RE.finditer(text):
+            sentence = match.group().strip()
+            if sentence:
+                if first_sentence is None:
+                    first_sentence = sentence
+                count += 1
+                if count > max(max_sentences, 1):
+                    break
         
-        if len(sentences) <= max_sentences:
+        if count <= max_sentences:
             return text
         
         # Simple algorithm: take first and last sentences
-        summary_sentences = []
-        if sentences:
-            summary_sentences.append(sentences[0])  # First sentence
-        if len(sentences) > 1:
-            summary_sentences.append(sentences[-1])  # Last sentence
+        summary_sentences = [first_sentence]
+        if count > 1:
+            # The last sentence follows the final terminator once trailing terminators are trimmed
+            tail = text
+            while True:
+                trimmed = tail.rstrip().rstrip('.!?')
+                if trimmed == tail:
+                    break
+                tail = trimmed
+            last_end = max(tail.rfind('.'), tail.rfind('!'), tail.rfind('?'))
+            summary_sentences.append(tail[last_end + 1:].strip())
         
         return ". ".join(summary_sentences) + "."
     
     def analyze_sentiment(self, text: str) -> dict:
         """Lightweight sentiment analysis with safety-aware vocabulary and weighting"""
-        positive_words = [
-            'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'love', 'like',
-            'safe', 'harmless', 'helpful', 'supportive'
-        ]
-        general_negative_words = [
-            'bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'angry', 'mad'
-        ]
-        safety_negative_words = [
-            'violence', 'violent', 'kill', 'murder', 'threat', 'threaten', 'attack', 'harm', 'hurt',
-            'shoot', 'stab', 'bomb', 'rape', 'abuse', 'terror', 'genocide', 'slur', 'lynch', 'execute'
-        ]
-
         text_lower = text.lower()
 
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        general_neg_count = sum(1 for word in general_negative_words if word in text_lower)
-        safety_neg_count = sum(1 for word in safety_negative_words if word in text_lower)
+        positive_count = sum(1 for word in _POSITIVE_WORDS if word in text_lower)
+        general_neg_count = sum(1 for word in _GENERAL_NEGATIVE_WORDS if word in text_lower)
+        safety_neg_count = sum(1 for word in _SAFETY_NEGATIVE_WORDS if word in text_lower)
 
         # Weight safety-related negatives more strongly
         negative_count = general_neg_count + (2 * safety_neg_count)
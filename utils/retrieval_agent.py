@@ -1,19 +1,55 @@
 # utils/retrieval_agent.py
 import sqlite3
 import hashlib
-import json
+import orjson
+import difflib
+import re
+import threading
+import queue
+import time
+import atexit
+import os
 from datetime import datetime
 from typing import List, Dict, Any
 
+# Tokens as FTS5's default unicode61 tokenizer sees them (letters and digits)
+_FTS_TOKEN_RE = re.compile(r'[^\W_]+')
+# Runs of anything but letters and digits, collapsed by normalize_text
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
 class RetrievalAgent:
-    def __init__(self, db_path: str = "moderation_history.db"):
+    # difflib's ratio() is O(n*m); above this combined length only its cheap upper bound is used
+    COMPARE_MAX_CHARS = 4000
+
+    def __init__(self, db_path: str = "moderation_history.db", flush_interval: float = None):
         self.db_path = db_path
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else float(os.getenv("HISTORY_FLUSH_INTERVAL", 1.0)))
+        self._tls = threading.local()
         self._init_database()
+        # Rows from store_moderation are queued and committed in batches by a background thread
+        self._pending = queue.Queue()
+        self._flush_lock = threading.Lock()
+        threading.Thread(target=self._flush_loop, name="history-writer", daemon=True).start()
+        atexit.register(self.flush)
+    
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection, opened once and reused with its prepared statements"""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = self._tls.conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            # INSERT OR REPLACE only fires the FTS delete trigger with this on
+            conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
     
     def _init_database(self):
         """Initialize SQLite database for content history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn().cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS moderation_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,46 +62,152 @@ class RetrievalAgent:
                 user_id TEXT
             )
         ''')
-        conn.commit()
-        conn.close()
+        self.fts_enabled = self._ensure_fts(cursor)
+    
+    def _ensure_fts(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        Mirror content_text into an FTS5 index kept in sync by triggers, so similarity
+        candidates come from an index lookup instead of a LIKE scan of every row.
+        """
+        try:
+            exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'moderation_fts'"
+            ).fetchone()
+            cursor.executescript('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS moderation_fts USING fts5(
+                    content_text, content='moderation_history', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS moderation_fts_ai AFTER INSERT ON moderation_history BEGIN
+                    INSERT INTO moderation_fts(rowid, content_text) VALUES (new.id, new.content_text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS moderation_fts_ad AFTER DELETE ON moderation_history BEGIN
+                    INSERT INTO moderation_fts(moderation_fts, rowid, content_text)
+                    VALUES ('delete', old.id, old.content_text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS moderation_fts_au AFTER UPDATE ON moderation_history BEGIN
+                    INSERT INTO moderation_fts(moderation_fts, rowid, content_text)
+                    VALUES ('delete', old.id, old.content_text);
+                    INSERT INTO moderation_fts(rowid, content_text) VALUES (new.id, new.content_text);
+                END;
+            ''')
+            if not exists:
+                # Index rows stored before the FTS table existed
+                cursor.execute("INSERT INTO moderation_fts(moderation_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.Error as e:
+            print(f"FTS5 unavailable, similarity search falls back to LIKE scans: {e}")
+            return False
+    
+    @staticmethod
+    def _fts_query(content: str) -> str:
+        """Phrase query for the opening of `content`; the last token may be cut, so match it as a prefix"""
+        tokens = _FTS_TOKEN_RE.findall(content[:50])
+        return '"' + ' '.join(tokens) + '"*' if tokens else None
+    
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """Key of a text in moderation_history; compute once and pass to both lookups"""
+        return hashlib.md5(content.encode()).hexdigest()
     
     def store_moderation(self, content: str, classification: dict, 
-                        risk_score: float, actions: list, user_id: str = "anonymous"):
-        """Store moderation result in database"""
-        content_hash = hashlib.md5(content.encode()).hexdigest()
+                        risk_score: float, actions: list, user_id: str = "anonymous",
+                        content_hash: str = None):
+        """Queue a moderation result; it is written within flush_interval seconds"""
+        content_hash = content_hash or self.content_hash(content)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO moderation_history 
-            (content_hash, content_text, classification, risk_score, actions_taken, timestamp, user_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (content_hash, content, json.dumps(classification), risk_score, 
-              json.dumps(actions), datetime.now(), user_id))
-        conn.commit()
-        conn.close()
+        self._pending.put_nowait((content_hash, content, orjson.dumps(classification).decode(), risk_score,
+                                  orjson.dumps(actions).decode(), datetime.now(), user_id))
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Moderation history flush failed: {e}")
+    
+    def flush(self):
+        """Write all queued moderation results in one transaction"""
+        with self._flush_lock:
+            rows = []
+            while True:
+                try:
+                    rows.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not rows:
+                return
+            conn = self._conn()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany('''
+                    INSERT OR REPLACE INTO moderation_history 
+                    (content_hash, content_text, classification, risk_score, actions_taken, timestamp, user_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
     
-    def find_similar_content(self, content: str, threshold: float = 0.8) -> List[Dict]:
+    def find_similar_content(self, content: str, threshold: float = 0.8,
+                             content_hash: str = None) -> List[Dict]:
         """Find historically similar moderated content"""
-        content_hash = hashlib.md5(content.encode()).hexdigest()
+        content_hash = content_hash or self.content_hash(content)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT content_text, classification, risk_score, actions_taken, timestamp
-            FROM moderation_history 
-            WHERE content_hash = ? OR content_text LIKE ?
-            LIMIT 5
-        ''', (content_hash, f"%{content[:50]}%"))
+        fts_query = self._fts_query(content) if self.fts_enabled else None
+        if fts_query:
+            # Exact hit first, then up to five texts sharing the opening phrase
+            cursor = self._conn().execute('''
+                SELECT content_text, classification, risk_score, actions_taken, timestamp
+                FROM moderation_history
+                WHERE content_hash = ?
+                   OR id IN (SELECT rowid FROM moderation_fts WHERE moderation_fts MATCH ? LIMIT 5)
+                ORDER BY content_hash = ? DESC
+                LIMIT 5
+            ''', (content_hash, fts_query, content_hash))
+        else:
+            cursor = self._conn().execute('''
+                SELECT content_text, classification, risk_score, actions_taken, timestamp
+                FROM moderation_history 
+                WHERE content_hash = ? OR content_text LIKE ?
+                LIMIT 5
+            ''', (content_hash, f"%{content[:50]}%"))
         
+        normalized = self.normalize_text(content)
         results = []
         for row in cursor.fetchall():
+            similarity, changed_chars = self._compare(content, row[0])
             results.append({
                 "content": row[0],
-                "classification": json.loads(row[1]),
+                "classification": orjson.loads(row[1]),
                 "risk_score": row[2],
-                "previous_actions": json.loads(row[3]),
-                "timestamp": row[4]
+                "previous_actions": orjson.loads(row[3]),
+                "timestamp": row[4],
+                "similarity": similarity,
+                "changed_chars": changed_chars,
+                # Same words in the same order; only case, punctuation and spacing differ
+                "normalized_match": normalized == self.normalize_text(row[0])
             })
-        conn.close()
-        return results
\ No newline at end of file
+        # Closest match first so callers can reuse the top hit
+        results.sort(key=lambda item: (not item["normalized_match"], -item["similarity"], item["changed_chars"]))
+        return results
+    
+    @staticmethod
+    def normalize_text(content: str) -> str:
+        """Casefolded text with punctuation/whitespace runs reduced to one space (word breaks are kept)"""
+        return _NON_WORD_RE.sub(' ', content.casefold()).strip()
+
+    @staticmethod
+    def _compare(content: str, other: str):
+        """(difflib ratio, characters of either text outside the matching blocks); approximate for long texts"""
+        if content == other:
+            return 1.0, 0
+        matcher = difflib.SequenceMatcher(None, content, other)
+        total = len(content) + len(other)
+        if total > RetrievalAgent.COMPARE_MAX_CHARS:
+            # Multiset overlap of characters: linear, and never below the exact figure
+            matched = int(matcher.quick_ratio() * total / 2)
+            return round(2.0 * matched / total, 4), total - 2 * matched
+        matched = sum(block.size for block in matcher.get_matching_blocks())
+        return round(2.0 * matched / total, 4), total - 2 * matched
\ No newline at end of file
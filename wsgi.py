@@ -0,0 +1,5 @@
+# wsgi.py
+# Production entry point: gunicorn -k gthread -w 4 --threads 32 wsgi:application
+from main import app
+
+application = app